@@ -6,28 +6,82 @@ from dash import dash_table
 from dash.dependencies import Input, Output, State
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
+import flask
+import plotly.graph_objects as go
 import base64
+import functools
 import io
 import os
 import sys
+import time
+import uuid
 
-import self
-import sqlite3
-import pandas as pd
+import export
+import genome
+import layoutcache
+import manhattan
+import selfdb
+import sessionstore
+
+# pysam and requests (via self), NumPy (via compare, columnar and liftover)
+# and pyarrow (via export) are imported where they are used; plotly is
+# imported by dash itself, so it is not deferred
 
 
 # Define the directory and file path to save uploaded files
-try:
+# (under a WSGI server sys.argv belongs to the server, so use the environment)
+if __name__ == "__main__" and len(sys.argv) > 1:
     UPLOAD_DIRECTORY = sys.argv[1]
-except:
-    UPLOAD_DIRECTORY = "uploads"
+else:
+    UPLOAD_DIRECTORY = os.environ.get("SELF_DNA_UPLOAD_DIR", "uploads")
 
 
 # Variable to store the file handle
 # VCF_fh = None
 
-# Variable to store the Self object
-self_dna = None
+# Active genome and ingest progress are kept per session in a shared store,
+# so that any server worker can serve any request
+session_store = sessionstore.SessionStore()
+
+# Rendered tab layouts, keyed by (genome DB, tab, DB version)
+layout_cache = layoutcache.LayoutCache()
+
+# Minimum number of seconds between two progress writes to the session store
+PROGRESS_WRITE_INTERVAL = 0.5
+
+# Maximum number of de novo candidates sent to the browser
+MAX_CANDIDATE_ROWS = 1000
+
+# UCSC GRCh37 to GRCh38 chain file (e.g. hg19ToHg38.over.chain.gz); when set,
+# GRCh37 uploads are lifted to GRCh38 before being processed
+LIFTOVER_CHAIN_FILE = os.environ.get("SELF_DNA_LIFTOVER_CHAIN")
+
+# Columns shown in the data tabs
+GWAS_CATALOG_COLUMNS = (
+    "CHROM",
+    "POS",
+    "ID",
+    "REF",
+    "ALT",
+    "QUAL",
+    "FILTER",
+    "REGION",
+    "FUNCTION",
+    "MINPVALUE",
+    "ASSOCIATIONS",
+)
+VARIANT_PATHOGENICITY_COLUMNS = (
+    "CHROM",
+    "POS",
+    "ID",
+    "REF",
+    "ALT",
+    "QUAL",
+    "FILTER",
+    "REGION",
+    "FUNCTION",
+    "PATHOGENICITY",
+)
 
 
 # Ensure the directory exists
@@ -42,8 +96,52 @@ app = dash.Dash(
     suppress_callback_exceptions=True,
 )
 
+# WSGI entry point for production servers, e.g. gunicorn app:server
+server = app.server
+
+# Cookie identifying a browser session; the session ID guards the session's
+# genomes, so it is never put in URLs (which end up in access logs)
+SESSION_COOKIE = "self_dna_session"
+
+
+@server.before_request
+def load_session_id():
+    session_id = flask.request.cookies.get(SESSION_COOKIE)
+    flask.g.new_session = session_id is None
+    flask.g.session_id = session_id or str(uuid.uuid4())
+
+
+@server.after_request
+def save_session_id(response):
+    if flask.g.get("new_session"):
+        response.set_cookie(
+            SESSION_COOKIE, flask.g.session_id, httponly=True, samesite="Strict"
+        )
+    return response
+
+
+def current_session_id():
+    """Return the session ID of the request being served."""
+    return flask.g.session_id
+
+
+# Stream the annotated variants of the session's active genome
+@server.route("/download/<export_format>")
+def download_variants(export_format):
+    db_file = session_store.get_active_genome(current_session_id())
+    if db_file is None or export_format not in export.EXPORT_FORMATS:
+        flask.abort(404)
+
+    generator, mimetype, filename = export.EXPORT_FORMATS[export_format]
+    db = selfdb.SelfDB(db_file, read_only=True)
+    return flask.Response(
+        flask.stream_with_context(generator(db, export.source_vcf_path(db_file))),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
 # Define the layout with centered title and tabs
-app.layout = dbc.Container(
+layout = dbc.Container(
     [
         # Title
         html.H1(
@@ -105,6 +203,21 @@ app.layout = dbc.Container(
                         "backgroundColor": "#222",
                     },
                 ),
+                dcc.Tab(
+                    label="Compare Genomes",
+                    value="compare-genomes",
+                    style={
+                        "font-family": "sans-serif",
+                        "backgroundColor": "#222",
+                        "color": "#ccc",
+                    },
+                    selected_style={
+                        "borderBottom": "3px solid #00FF7F",
+                        "font-family": "sans-serif",
+                        "color": "#00FF7F",
+                        "backgroundColor": "#222",
+                    },
+                ),
                 dcc.Tab(
                     label="Genome Statistics",
                     value="genome-statistics",
@@ -180,6 +293,9 @@ app.layout = dbc.Container(
 )
 
 
+app.layout = layout
+
+
 def render_upload_vcf_tab(
     content_style: dict = {
         "color": "#00FF7F",
@@ -228,18 +344,23 @@ def render_upload_vcf_tab(
     )
 
 
-def render_about_tab(content_style):
+@functools.lru_cache(maxsize=1)
+def read_about_markdown():
     # Path to your Markdown file
     markdown_file_path = os.path.join(
         os.getcwd(), "assets/about.md"
     )  # Ensure the file is in the same directory as the app
 
-    # Read the Markdown file
+    # Read the Markdown file once per process
     try:
         with open(markdown_file_path, "r") as file:
-            markdown_content = file.read()
+            return file.read()
     except FileNotFoundError:
-        markdown_content = "The About content is currently unavailable. Please ensure the `about.md` file exists."
+        return "The About content is currently unavailable. Please ensure the `about.md` file exists."
+
+
+def render_about_tab(content_style):
+    markdown_content = read_about_markdown()
 
     style_dict = {
         "color": "#FFFFFF",  # White text for the body
@@ -264,18 +385,91 @@ def render_about_tab(content_style):
     )
 
 
+def render_manhattan_figure(db_path, start=0, end=genome.GENOME_LENGTH):
+    # Fetch only the pyramid bins in view, at the resolution fitting the view
+    db = selfdb.SelfDB(db_path, read_only=True)
+    bins = manhattan.fetch_bins(db, start, end)
+
+    # Alternate colors between consecutive chromosomes
+    chrom_ranks = [genome.CHROM_CODES[genome.normalize_chrom(b[1])] for b in bins]
+    figure = go.Figure(
+        go.Scattergl(
+            x=[b[0] for b in bins],
+            y=[b[4] for b in bins],
+            mode="markers",
+            marker={
+                "size": 5,
+                "color": ["#00FF7F" if r % 2 == 0 else "#ccc" for r in chrom_ranks],
+            },
+            text=[f"{b[3]} ({b[1]}:{b[2]})" for b in bins],
+            hovertemplate="%{text}<br>-log10 p = %{y:.2f}<extra></extra>",
+        )
+    )
+    figure.update_layout(
+        template="plotly_dark",
+        paper_bgcolor="#222",
+        plot_bgcolor="#222",
+        margin={"l": 40, "r": 20, "t": 20, "b": 40},
+        # Keep the user's zoom across figure updates
+        uirevision="manhattan",
+        xaxis={
+            "range": [start, end],
+            "tickvals": [
+                genome.CHROM_OFFSETS[c] + length // 2
+                for c, length in genome.GRCH38_CHROM_LENGTHS.items()
+            ],
+            "ticktext": list(genome.GRCH38_CHROM_LENGTHS.keys()),
+            "showgrid": False,
+        },
+        yaxis={"title": "-log10 p", "rangemode": "tozero"},
+    )
+    return figure
+
+
+def render_export_links():
+    # Download links to the streaming export endpoint
+    labels = {
+        "tsv": "TSV (gzip)",
+        "csv": "CSV (gzip)",
+        "parquet": "Parquet",
+        "vcf": "Annotated VCF",
+    }
+    return html.Div(
+        [html.Span("Export variants: ", style={"color": "#ccc"})]
+        + [
+            html.A(
+                label,
+                href=f"/download/{export_format}",
+                style={"color": "#00FF7F", "margin-right": "20px"},
+            )
+            for export_format, label in labels.items()
+        ],
+        style={"margin-bottom": "20px"},
+    )
+
+
 # Function to render GWAS Catalog tab content with row selection dropdown
 def render_gwas_catalog_tab(content_style, db_path):
-    # Connect to SQLite database
-    conn = sqlite3.connect(db_path)
-    query = "SELECT CHROM, POS, ID, REF, ALT, QUAL, FILTER, REGION, FUNCTION, MINPVALUE, ASSOCIATIONS FROM variants WHERE ASSOCIATIONS IS NOT NULL AND ASSOCIATIONS != '';"
-    df = pd.read_sql(query, conn)
-    conn.close()
+    # Stream rows from the Self DB through a read-only pooled connection
+    db = selfdb.SelfDB(db_path, read_only=True)
+    columns = GWAS_CATALOG_COLUMNS
+    rows = db.iter_data(
+        "variants",
+        columns,
+        "WHERE ASSOCIATIONS IS NOT NULL AND ASSOCIATIONS != ''",
+    )
+    records = [dict(zip(columns, row)) for row in rows]
 
     # Layout for GWAS Catalog tab with row selection
     return html.Div(
         [
             html.H3("GWAS Catalog", style=content_style),
+            # Genome-wide Manhattan plot, refined on zoom and pan
+            dcc.Graph(
+                id="manhattan-plot",
+                figure=render_manhattan_figure(db_path),
+                config={"displaylogo": False},
+            ),
             # Dropdown for selecting page size
             html.Label("Rows per page:", style={"color": "#ccc"}),
             dcc.Dropdown(
@@ -298,8 +492,8 @@ def render_gwas_catalog_tab(content_style, db_path):
             # Interactive DataTable
             dash_table.DataTable(
                 id="gwas-catalog-table",
-                columns=[{"name": col, "id": col} for col in df.columns],
-                data=df.to_dict("records"),
+                columns=[{"name": col, "id": col} for col in columns],
+                data=records,
                 filter_action="native",
                 sort_action="native",
                 page_action="native",
@@ -313,11 +507,15 @@ def render_gwas_catalog_tab(content_style, db_path):
 
 
 def render_variant_pathogenicity_tab(content_style, db_path):
-    # Connect to SQLite database
-    conn = sqlite3.connect(db_path)
-    query = "SELECT CHROM, POS, ID, REF, ALT, QUAL, FILTER, REGION, FUNCTION, PATHOGENICITY FROM variants WHERE PATHOGENICITY IS NOT NULL AND PATHOGENICITY != '';"
-    df = pd.read_sql(query, conn)
-    conn.close()
+    # Stream rows from the Self DB through a read-only pooled connection
+    db = selfdb.SelfDB(db_path, read_only=True)
+    columns = VARIANT_PATHOGENICITY_COLUMNS
+    rows = db.iter_data(
+        "variants",
+        columns,
+        "WHERE PATHOGENICITY IS NOT NULL AND PATHOGENICITY != ''",
+    )
+    records = [dict(zip(columns, row)) for row in rows]
 
     # Layout for Variant Pathogenicity tab with row selection
     return html.Div(
@@ -345,8 +543,8 @@ def render_variant_pathogenicity_tab(content_style, db_path):
             # Interactive DataTable
             dash_table.DataTable(
                 id="variant-pathogenicity-table",
-                columns=[{"name": col, "id": col} for col in df.columns],
-                data=df.to_dict("records"),
+                columns=[{"name": col, "id": col} for col in columns],
+                data=records,
                 filter_action="native",
                 sort_action="native",
                 page_action="native",
@@ -359,6 +557,167 @@ def render_variant_pathogenicity_tab(content_style, db_path):
     )
 
 
+def render_genome_statistics_tab(content_style, db_path):
+    import columnar
+
+    # Vectorized scans over the memory-mapped columnar sidecar
+    statistics = columnar.ColumnarStore(columnar.sidecar_path(db_path)).statistics()
+    chrom_counts = statistics.pop("CHROM_COUNTS")
+
+    figure = go.Figure(
+        go.Bar(
+            x=list(chrom_counts.keys()),
+            y=list(chrom_counts.values()),
+            marker={"color": "#00FF7F"},
+        )
+    )
+    figure.update_layout(
+        template="plotly_dark",
+        paper_bgcolor="#222",
+        plot_bgcolor="#222",
+        margin={"l": 40, "r": 20, "t": 20, "b": 40},
+        xaxis={"title": "Chromosome", "type": "category"},
+        yaxis={"title": "Variants"},
+    )
+
+    # Layout for Genome Statistics tab with summary table and per-chromosome counts
+    return html.Div(
+        [
+            html.H3("Genome Statistics", style=content_style),
+            dash_table.DataTable(
+                id="genome-statistics-table",
+                columns=[{"name": col, "id": col} for col in statistics],
+                data=[statistics],
+                style_table={"overflowX": "auto"},
+                style_header={"backgroundColor": "#333", "color": "#00FF7F"},
+                style_cell={"backgroundColor": "#222", "color": "#ccc"},
+            ),
+            dcc.Graph(
+                id="genome-statistics-chrom-plot",
+                figure=figure,
+                config={"displaylogo": False},
+            ),
+        ]
+    )
+
+
+def render_compare_genomes_tab(content_style, genomes):
+    options = [{"label": name, "value": db_file} for name, db_file in genomes]
+
+    # Layout for Compare Genomes tab with genome and proband selection
+    return html.Div(
+        [
+            html.H3("Compare Genomes", style=content_style),
+            html.Label("Genomes:", style={"color": "#ccc"}),
+            dcc.Checklist(
+                id="compare-genomes-checklist",
+                options=options,
+                value=[option["value"] for option in options],
+                labelStyle={"display": "block"},
+                style={"color": "#ccc", "margin-bottom": "10px"},
+            ),
+            html.Label("Proband:", style={"color": "#ccc"}),
+            dcc.Dropdown(
+                id="compare-genomes-proband-dropdown",
+                options=options,
+                value=options[-1]["value"] if options else None,
+                clearable=False,
+                style={
+                    "width": "400px",
+                    "backgroundColor": "#222",
+                    "color": "#00FF7F",
+                    "font-family": "sans-serif",
+                    "border": "1px solid #444",
+                },
+                className="page-size-dropdown",
+            ),
+            html.Button(
+                "Compare",
+                id="compare-genomes-button",
+                style={
+                    "margin": "20px 0px",
+                    "backgroundColor": "#333",
+                    "color": "#00FF7F",
+                    "border": "1px solid #444",
+                },
+            ),
+            dcc.Loading(
+                type="circle",
+                children=html.Div(id="compare-genomes-output"),
+            ),
+        ]
+    )
+
+
+# Compare the selected genomes over their shared site dictionary
+@app.callback(
+    Output("compare-genomes-output", "children"),
+    [
+        Input("compare-genomes-button", "n_clicks"),
+        State("compare-genomes-checklist", "value"),
+        State("compare-genomes-proband-dropdown", "value"),
+    ],
+)
+def compare_genomes(n_clicks, db_files, proband):
+    if not n_clicks or not db_files:
+        raise PreventUpdate
+    import compare
+
+    # Only compare genomes uploaded by this session: the checklist and
+    # dropdown values come from the client and cannot be trusted
+    genomes = session_store.list_genomes(current_session_id())
+    names = dict([(db_file, name) for name, db_file in genomes])
+    db_files = [db_file for db_file in db_files if db_file in names]
+    if not db_files:
+        raise PreventUpdate
+    comparison = compare.GenomeComparison(
+        db_files, [names.get(db_file, db_file) for db_file in db_files]
+    )
+
+    summary = comparison.summary()
+    children = [
+        dash_table.DataTable(
+            id="compare-genomes-summary-table",
+            columns=[{"name": col, "id": col} for col in summary[0]],
+            data=summary,
+            style_table={"overflowX": "auto"},
+            style_header={"backgroundColor": "#333", "color": "#00FF7F"},
+            style_cell={"backgroundColor": "#222", "color": "#ccc"},
+        )
+    ]
+
+    # De novo candidates need at least one other genome to be absent from
+    if proband in db_files and len(db_files) > 1:
+        candidates = comparison.de_novo_candidates(db_files.index(proband))
+        records = comparison.site_records(candidates[:MAX_CANDIDATE_ROWS])
+        children += [
+            html.H5(
+                f"De novo candidates in {names.get(proband, proband)}",
+                style={"color": "#00FF7F", "margin-top": "30px"},
+            ),
+            html.P(
+                f"Showing the first {len(records)} of {len(candidates)} candidates.",
+                style={"color": "#ccc"},
+            ),
+            dash_table.DataTable(
+                id="compare-genomes-de-novo-table",
+                columns=[
+                    {"name": col, "id": col}
+                    for col in ["CHROM", "POS", "REF", "ALT", "CARRIERS"]
+                ],
+                data=records,
+                filter_action="native",
+                sort_action="native",
+                page_action="native",
+                page_size=16,
+                style_table={"overflowX": "auto"},
+                style_header={"backgroundColor": "#333", "color": "#00FF7F"},
+                style_cell={"backgroundColor": "#222", "color": "#ccc"},
+            ),
+        ]
+    return children
+
+
 # Update the table page size based on the dropdown selection
 @app.callback(
     Output("gwas-catalog-table", "page_size"),
@@ -368,6 +727,27 @@ def gwas_catalog_update_size(page_size):
     return page_size
 
 
+# Refetch the Manhattan plot bins in view on zoom and pan
+@app.callback(
+    Output("manhattan-plot", "figure"),
+    Input("manhattan-plot", "relayoutData"),
+)
+def manhattan_update_view(relayout_data):
+    db_file = session_store.get_active_genome(current_session_id())
+    if db_file is None or relayout_data is None:
+        raise PreventUpdate
+    if "xaxis.range[0]" in relayout_data:
+        start = relayout_data["xaxis.range[0]"]
+        end = relayout_data["xaxis.range[1]"]
+    elif "xaxis.range" in relayout_data:
+        start, end = relayout_data["xaxis.range"]
+    elif relayout_data.get("xaxis.autorange"):
+        start, end = 0, genome.GENOME_LENGTH
+    else:
+        raise PreventUpdate
+    return render_manhattan_figure(db_file, start, end)
+
+
 # Update the table page size based on the dropdown selection
 @app.callback(
     Output("variant-pathogenicity-table", "page_size"),
@@ -377,16 +757,35 @@ def variant_pathogenicity_update_size(page_size):
     return page_size
 
 
+def render_cached_tab(db_file, tab, render):
+    # Serve the tab layout from the cache while the Self DB is unchanged
+    version = selfdb.SelfDB(db_file, read_only=True).get_version()
+    if version == 0:
+        # Ingest still running: never cache partial results
+        return render()
+    key = (db_file, tab, version)
+    layout = layout_cache.get(key)
+    if layout is None:
+        layout = render()
+        layout_cache.put(key, layout)
+    return layout
+
+
 # Callback to update content based on selected tab
-@app.callback(Output("tabs-content", "children"), [Input("tabs", "value")])
+@app.callback(
+    Output("tabs-content", "children"),
+    Input("tabs", "value"),
+)
 def render_tab_content(tab):
+    session_id = current_session_id()
+    db_file = session_store.get_active_genome(session_id)
     content_style = {"color": "#00FF7F", "font-size": "20px", "margin-bottom": "10px"}
 
     if tab == "upload-vcf":
         return render_upload_vcf_tab(content_style)
 
     elif tab == "gwas-catalog":
-        if self_dna == None:
+        if db_file is None:
             return html.Div(
                 [
                     html.H3("GWAS Catalog", style=content_style),
@@ -394,8 +793,15 @@ def render_tab_content(tab):
                 ]
             )
         else:
-            return render_gwas_catalog_tab(
-                content_style, list(self_dna.db_file_dict.items())[0][1]
+            return html.Div(
+                [
+                    render_cached_tab(
+                        db_file,
+                        tab,
+                        lambda: render_gwas_catalog_tab(content_style, db_file),
+                    ),
+                    render_export_links(),
+                ]
             )
 
     elif tab == "polygenic-risk-scores":
@@ -407,7 +813,7 @@ def render_tab_content(tab):
         )
 
     elif tab == "variant-pathogenicity":
-        if self_dna == None:
+        if db_file is None:
             return html.Div(
                 [
                     html.H3("Variant Pathogenicity", style=content_style),
@@ -415,8 +821,10 @@ def render_tab_content(tab):
                 ]
             )
         else:
-            return render_variant_pathogenicity_tab(
-                content_style, list(self_dna.db_file_dict.items())[0][1]
+            return render_cached_tab(
+                db_file,
+                tab,
+                lambda: render_variant_pathogenicity_tab(content_style, db_file),
             )
 
     elif tab == "curated-kb":
@@ -427,14 +835,28 @@ def render_tab_content(tab):
             ]
         )
 
-    elif tab == "genome-statistics":
-        return html.Div(
-            [
-                html.H3("Genome Statistics", style=content_style),
-                html.P("Genome Statistics content goes here."),
-            ]
+    elif tab == "compare-genomes":
+        return render_compare_genomes_tab(
+            content_style, session_store.list_genomes(session_id)
         )
 
+    elif tab == "genome-statistics":
+        import columnar
+
+        if db_file is None or not os.path.isdir(columnar.sidecar_path(db_file)):
+            return html.Div(
+                [
+                    html.H3("Genome Statistics", style=content_style),
+                    html.P("Genome Statistics content goes here."),
+                ]
+            )
+        else:
+            return render_cached_tab(
+                db_file,
+                tab,
+                lambda: render_genome_statistics_tab(content_style, db_file),
+            )
+
     elif tab == "about":
         return render_about_tab(content_style)
 
@@ -443,21 +865,30 @@ def render_tab_content(tab):
         return html.Div([html.P("Select a tab to see content.")])
 
 
-progress_state = {"processed": 0, "total": 1}
+def session_progress_callback(session_id):
+    """Return a progress callback that records progress in the session store."""
+    last_write = 0.0
 
+    def update_progress(processed, total):
+        nonlocal last_write
+        now = time.monotonic()
+        if processed == total or now - last_write >= PROGRESS_WRITE_INTERVAL:
+            session_store.set_progress(session_id, processed, total)
+            last_write = now
 
-def update_progress(processed, total):
-    global progress_state
-    progress_state["processed"] = processed
-    progress_state["total"] = total
+    return update_progress
 
 
 # Callback to handle file upload
 @app.callback(
     [Output("output-data-upload", "children"), Output("progress-interval", "disabled")],
-    [Input("upload-data", "contents"), State("upload-data", "filename")],
+    [
+        Input("upload-data", "contents"),
+        State("upload-data", "filename"),
+    ],
 )
 def get_self_from_vcf_upload(contents, filename):
+    session_id = current_session_id()
     # global VCF_fh
     # if contents is not None:
     #    # Decode the uploaded file
@@ -470,30 +901,61 @@ def get_self_from_vcf_upload(contents, filename):
     #    # Optional display message
     #    return html.Div([html.H5(f"File '{filename}' uploaded successfully!")])
     # TODO: if filename is not None, warn about overwriting data
-    global self_dna
-
     if contents is not None:
         # Decode the uploaded file
         content_type, content_string = contents.split(",")
         decoded = base64.b64decode(content_string)
 
-        # Save the file
-        file_path = os.path.join(UPLOAD_DIRECTORY, filename)
+        # Save the file in a directory of its own, since uploads of every
+        # session and worker share UPLOAD_DIRECTORY
+        upload_dir = os.path.join(UPLOAD_DIRECTORY, str(uuid.uuid4()))
+        os.makedirs(upload_dir)
+        file_path = os.path.join(upload_dir, os.path.basename(filename) or "upload.vcf")
         with open(file_path, "wb") as f:
             f.write(decoded)
 
+        import liftover
+        import self
+
+        # lift GRCh37 uploads to GRCh38, which the annotations assume
+        messages = []
+        if LIFTOVER_CHAIN_FILE and liftover.is_grch37(file_path):
+            lifted_path = f"{os.path.splitext(file_path)[0]}.GRCh38.vcf"
+            n_lifted, n_unmapped = liftover.lift_vcf(
+                file_path, lifted_path, liftover.load_chain_map(LIFTOVER_CHAIN_FILE)
+            )
+            file_path = lifted_path
+            messages.append(
+                html.P(
+                    f"{n_lifted} variants lifted from GRCh37 to GRCh38, "
+                    f"{n_unmapped} could not be lifted and were left out."
+                )
+            )
+
         # build the self object
-        global self_dna
         self_dna = self.Self(file_path)
 
         # process variants
         internal_id = list(self_dna.internal_id_dict.keys())[0]
         internal_db = self_dna.db_file_dict[internal_id]
-        self_dna.vcf_to_sqlite(file_path, internal_db, update_progress)
+        session_store.set_progress(session_id, 0, 1)
+        self_dna.vcf_to_sqlite(
+            file_path, internal_db, session_progress_callback(session_id)
+        )
+        layout_cache.invalidate(internal_db)
+
+        # select the genome for this session only once its Self DB is complete,
+        # so that no worker opens a Self DB that does not exist yet
+        session_store.set_active_genome(session_id, file_path, internal_db)
+        session_store.add_genome(session_id, filename, internal_db)
 
         # Optional display message
-        return html.Div(
-            [html.H5(f"File '{filename}' uploaded and processed successfully!")]
+        return (
+            html.Div(
+                [html.H5(f"File '{filename}' uploaded and processed successfully!")]
+                + messages
+            ),
+            True,
         )
 
     else:
@@ -502,17 +964,16 @@ def get_self_from_vcf_upload(contents, filename):
 
 @app.callback(
     Output("progress-container", "children"),
-    [Input("progress-interval", "n_intervals")],
+    Input("progress-interval", "n_intervals"),
 )
 def update_progress_display(n_intervals):
-    global progress_state
-    processed, total = progress_state["processed"], progress_state["total"]
+    processed, total = session_store.get_progress(current_session_id())
     if total == 1:
         return ""
     progress = (processed / total) * 100
     return f"Processing: {processed}/{total} variants ({progress:.2f}%)."
 
 
-# Run the app
+# Run the app with the development server (see gunicorn.conf.py for production)
 if __name__ == "__main__":
-    app.run_server(host="0.0.0.0", debug=False)
+    app.run(host="0.0.0.0", debug=False)
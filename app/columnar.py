@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+
+import array
+import os
+import shutil
+
+import numpy as np
+
+import genome
+
+
+# Columns of the sidecar: name -> (array typecode while ingesting, NumPy dtype)
+NUMERIC_COLUMNS = {
+    "CHROM": ("b", np.int8),  # genome.CHROM_CODES, -1 for other contigs
+    "POS": ("q", np.int64),
+    "QUAL": ("d", np.float64),  # NaN when missing
+    "GT": ("b", np.int8),  # genotype class, see genotype_code()
+    "MINPVALUE": ("d", np.float64),  # NaN without GWAS Catalog associations
+}
+ALLELE_COLUMNS = ("REF", "ALT")
+
+# Genome-wide significance threshold
+GWAS_SIGNIFICANCE = 5e-8
+
+
+def sidecar_path(db_file: str) -> str:
+    """
+    Returns the path of the columnar sidecar of a Self DB.
+
+    Parameters:
+        db_file (str): Path to the Self DB.
+    """
+    return f"{os.path.splitext(db_file)[0]}.columns"
+
+
+def genotype_field(format_: str, sample: str):
+    """
+    Returns a sample's GT value.
+
+    Parameters:
+        format_ (str): VCF FORMAT field, e.g. "GT:DP".
+        sample (str): VCF sample field, e.g. "0/1:12".
+
+    Returns:
+        str or None: GT value, e.g. "0/1", or None when the sample has none.
+    """
+    keys = format_.split(":")
+    if "GT" not in keys:
+        return None
+    values = sample.split(":")
+    index = keys.index("GT")
+    if index >= len(values):
+        return None
+    return values[index]
+
+
+def genotype_alleles(gt: str):
+    """
+    Splits a GT value into its allele indices.
+
+    Parameters:
+        gt (str or None): GT value, e.g. "0|1".
+
+    Returns:
+        list or None: Allele indices as strings, or None for a no-call.
+    """
+    if gt is None:
+        return None
+    alleles = gt.replace("|", "/").split("/")
+    return None if "." in alleles else alleles
+
+
+def genotype_code(gt: str) -> int:
+    """
+    Encodes a sample's GT as its genotype class.
+
+    Parameters:
+        gt (str or None): GT value, see genotype_field().
+
+    Returns:
+        int: 0 (hom-ref), 1 (heterozygous, including het-alt such as 1/2),
+             2 (hom-alt: all alleles the same ALT allele), or -1 when missing.
+    """
+    alleles = genotype_alleles(gt)
+    if alleles is None:
+        return -1
+    if len(set(alleles)) > 1:
+        return 1
+    return 0 if alleles[0] == "0" else 2
+
+
+class ColumnarWriter:
+    """
+    Accumulates variants in compact typed arrays and writes them as .npy files.
+
+    Alleles are stored Arrow-style, as concatenated UTF-8 bytes plus offsets.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters:
+            path (str): Path to the sidecar directory.
+        """
+        self.path = path
+        self.columns = dict(
+            [(col, array.array(code)) for col, (code, _) in NUMERIC_COLUMNS.items()]
+        )
+        self.allele_data = dict([(col, bytearray()) for col in ALLELE_COLUMNS])
+        self.allele_offsets = dict(
+            [(col, array.array("q", [0])) for col in ALLELE_COLUMNS]
+        )
+
+    def append(self, chrom, pos, ref, alt, qual, gt, min_pvalue):
+        """
+        Appends a variant.
+
+        Parameters:
+            chrom (str): Contig name.
+            pos (int): 1-based position.
+            ref (str): Reference allele.
+            alt (str): Alternate allele(s).
+            qual (float or None): Variant quality.
+            gt (int): Genotype code, see genotype_code().
+            min_pvalue (float or None): Minimum GWAS Catalog p-value.
+        """
+        self.columns["CHROM"].append(
+            genome.CHROM_CODES.get(genome.normalize_chrom(chrom), -1)
+        )
+        self.columns["POS"].append(pos)
+        self.columns["QUAL"].append(np.nan if qual is None else qual)
+        self.columns["GT"].append(gt)
+        self.columns["MINPVALUE"].append(np.nan if min_pvalue is None else min_pvalue)
+        for col, allele in zip(ALLELE_COLUMNS, (ref, alt)):
+            self.allele_data[col] += allele.encode()
+            self.allele_offsets[col].append(len(self.allele_data[col]))
+
+    def close(self):
+        """
+        Writes the sidecar, replacing any previous one.
+        """
+        tmp_path = f"{self.path}.tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        for col, (_, dtype) in NUMERIC_COLUMNS.items():
+            np.save(
+                os.path.join(tmp_path, f"{col}.npy"),
+                np.frombuffer(self.columns[col], dtype=dtype),
+            )
+        for col in ALLELE_COLUMNS:
+            np.save(
+                os.path.join(tmp_path, f"{col}.data.npy"),
+                np.frombuffer(bytes(self.allele_data[col]), dtype=np.uint8),
+            )
+            np.save(
+                os.path.join(tmp_path, f"{col}.offsets.npy"),
+                np.frombuffer(self.allele_offsets[col], dtype=np.int64),
+            )
+
+        if os.path.exists(self.path):
+            shutil.rmtree(self.path)
+        os.replace(tmp_path, self.path)
+
+
+class ColumnarStore:
+    """
+    Read-only, memory-mapped view of a columnar sidecar.
+
+    Columns are mapped lazily on first access, so opening a store is
+    near-instant and scans only page in the columns they touch.
+    """
+
+    def __init__(self, path: str):
+        """
+        Parameters:
+            path (str): Path to the sidecar directory.
+        """
+        if not os.path.isdir(path):
+            raise FileNotFoundError(f"No columnar sidecar at '{path}'.")
+        self.path = path
+        self._columns = {}
+
+    def _load(self, name: str) -> np.ndarray:
+        column = self._columns.get(name)
+        if column is None:
+            file = os.path.join(self.path, f"{name}.npy")
+            try:
+                column = np.load(file, mmap_mode="r")
+            except ValueError:
+                # Empty columns cannot be memory-mapped
+                column = np.load(file)
+            self._columns[name] = column
+        return column
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        """
+        Returns a numeric column (CHROM, POS, QUAL, GT or MINPVALUE).
+        """
+        if col not in NUMERIC_COLUMNS:
+            raise KeyError(col)
+        return self._load(col)
+
+    def __len__(self) -> int:
+        return len(self["POS"])
+
+    def allele_lengths(self, col: str) -> np.ndarray:
+        """
+        Returns the length of every REF or ALT allele string.
+        """
+        return np.diff(self._load(f"{col}.offsets"))
+
+    def alleles(self, col: str, indices) -> list:
+        """
+        Decodes the REF or ALT alleles of the given variants.
+
+        Parameters:
+            col (str): "REF" or "ALT".
+            indices (array-like): Variant indices.
+        """
+        data = self._load(f"{col}.data")
+        offsets = self._load(f"{col}.offsets")
+        return [
+            data[offsets[i] : offsets[i + 1]].tobytes().decode() for i in indices
+        ]
+
+    def select(
+        self, chrom: str = None, start: int = None, end: int = None, max_pvalue=None
+    ) -> np.ndarray:
+        """
+        Returns the indices of the variants matching all given filters.
+
+        Parameters:
+            chrom (str, optional): Contig name.
+            start (int, optional): Minimum position.
+            end (int, optional): Maximum position.
+            max_pvalue (float, optional): Maximum GWAS Catalog p-value.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if chrom is not None:
+            mask &= self["CHROM"] == genome.CHROM_CODES.get(
+                genome.normalize_chrom(chrom), -1
+            )
+        if start is not None:
+            mask &= self["POS"] >= start
+        if end is not None:
+            mask &= self["POS"] <= end
+        if max_pvalue is not None:
+            mask &= self["MINPVALUE"] <= max_pvalue
+        return np.flatnonzero(mask)
+
+    def statistics(self) -> dict:
+        """
+        Computes genome-wide variant statistics with vectorized scans.
+
+        SNVS and INDELS only count biallelic records; multi-allelic records
+        are counted separately as MULTIALLELIC.
+
+        Returns:
+            dict: Summary counts, and variant counts per chromosome.
+        """
+        chrom = self["CHROM"]
+        gt = self["GT"]
+        ref_lengths = self.allele_lengths("REF")
+        alt_lengths = self.allele_lengths("ALT")
+
+        # Records whose ALT field lists several alleles
+        alt_offsets = self._load("ALT.offsets")
+        commas = np.flatnonzero(self._load("ALT.data") == ord(","))
+        multiallelic = np.zeros(len(self), dtype=bool)
+        multiallelic[np.searchsorted(alt_offsets, commas, side="right") - 1] = True
+        biallelic = ~multiallelic
+
+        chrom_counts = np.bincount(
+            chrom[chrom >= 0], minlength=len(genome.CHROM_CODES)
+        )
+        return {
+            "VARIANTS": len(self),
+            "SNVS": int(
+                np.count_nonzero(biallelic & (ref_lengths == 1) & (alt_lengths == 1))
+            ),
+            "INDELS": int(np.count_nonzero(biallelic & (ref_lengths != alt_lengths))),
+            "MULTIALLELIC": int(np.count_nonzero(multiallelic)),
+            "HETEROZYGOUS": int(np.count_nonzero(gt == 1)),
+            "HOMOZYGOUS_ALT": int(np.count_nonzero(gt == 2)),
+            "GWAS_ASSOCIATED": int(np.count_nonzero(~np.isnan(self["MINPVALUE"]))),
+            "GWAS_SIGNIFICANT": int(
+                np.count_nonzero(self["MINPVALUE"] <= GWAS_SIGNIFICANCE)
+            ),
+            "CHROM_COUNTS": dict(zip(genome.CHROM_CODES, chrom_counts.tolist())),
+        }
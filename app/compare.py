@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+
+import numpy as np
+
+import columnar
+import genome
+import selfdb
+
+
+# Integer encoding of a (CHROM, POS, REF, ALT) site
+SITE_DTYPE = np.dtype([("CHROM", np.int32), ("POS", np.int64), ("ALLELES", np.int32)])
+
+
+class GenomeComparison:
+    """
+    Compares the variants of several Self DBs over a shared site dictionary.
+
+    Every distinct (CHROM, POS, REF, ALT) site across the genomes gets an
+    integer index. Sites are encoded as integers, (contig id, POS, allele pair
+    id) with contigs and allele pairs interned in dicts, so the dictionary
+    costs 16 bytes per site whatever the allele lengths. Each genome's
+    carrier status is a row of a boolean
+    (genomes x sites) matrix, so that shared, private and de-novo-candidate
+    variant sets are vectorized set operations instead of SQL self-joins.
+
+    A genome carries a site only when its GT calls that ALT allele:
+    multi-allelic records give one site per called ALT allele, and hom-ref
+    records none. No-calls leave the genotype at their position unknown, so
+    a site is never private to a genome while another genome has a no-call
+    at its position.
+    """
+
+    def __init__(self, db_files: list, names: list = None):
+        """
+        Builds the site dictionary and carrier matrix of a set of genomes.
+
+        Parameters:
+            db_files (list): Paths to the Self DBs to compare.
+            names (list, optional): Display names of the genomes.
+                                    Defaults to the Self DB paths.
+        """
+        self.db_files = list(db_files)
+        self.names = list(names) if names is not None else list(self.db_files)
+
+        # Interned contig names and (REF, ALT) pairs, shared by all genomes
+        chrom_ids = {}
+        allele_ids = {}
+
+        genome_keys = []
+        genome_pass = []
+        genome_no_calls = []
+        for db_file in self.db_files:
+            db = selfdb.SelfDB(db_file, read_only=True)
+            keys = []
+            passed = []
+            no_calls = []
+            for chrom, pos, ref, alt, filter_, gt in db.iter_data(
+                "variants", ["CHROM", "POS", "REF", "ALT", "FILTER", "GT"]
+            ):
+                chrom_id = chrom_ids.setdefault(
+                    genome.normalize_chrom(chrom), len(chrom_ids)
+                )
+                alleles = columnar.genotype_alleles(gt)
+                if alleles is None:
+                    # No-call positions, packed like site_positions below
+                    no_calls.append(chrom_id << 32 | pos)
+                    continue
+
+                # One site per called ALT allele
+                alts = alt.split(",")
+                for allele in sorted(set(alleles) - {"0"}, key=int):
+                    index = int(allele) - 1
+                    if index >= len(alts) or alts[index] in (".", "*"):
+                        continue
+                    allele_id = allele_ids.setdefault(
+                        (ref, alts[index]), len(allele_ids)
+                    )
+                    keys.append((chrom_id, pos, allele_id))
+                    passed.append(filter_ in ("PASS", "."))
+            genome_keys.append(np.array(keys, dtype=SITE_DTYPE))
+            genome_pass.append(np.array(passed, dtype=bool))
+            genome_no_calls.append(np.array(no_calls, dtype=np.int64))
+
+        self.chrom_names = list(chrom_ids)
+        self.allele_pairs = list(allele_ids)
+
+        # Shared site dictionary: site index = rank of the site key
+        self.sites, site_index = np.unique(
+            np.concatenate(genome_keys) if genome_keys else np.array([], SITE_DTYPE),
+            return_inverse=True,
+        )
+        site_index = site_index.reshape(-1)
+        site_positions = self.sites["CHROM"].astype(np.int64) << 32 | self.sites["POS"]
+
+        # Carrier, FILTER == PASS and unknown genotype status, one row per genome
+        self.carriers = np.zeros((len(self.db_files), len(self.sites)), dtype=bool)
+        self.passed = np.zeros_like(self.carriers)
+        self.unknown = np.zeros_like(self.carriers)
+        self.no_call_counts = [len(no_calls) for no_calls in genome_no_calls]
+        start = 0
+        for i, (keys, passed, no_calls) in enumerate(
+            zip(genome_keys, genome_pass, genome_no_calls)
+        ):
+            indices = site_index[start : start + len(keys)]
+            self.carriers[i, indices] = True
+            self.passed[i, indices] = passed
+            self.unknown[i] = np.isin(site_positions, no_calls) & ~self.carriers[i]
+            start += len(keys)
+
+        self.carrier_counts = self.carriers.sum(axis=0)
+        self.unknown_counts = self.unknown.sum(axis=0)
+
+    def _genome_row(self, genome_id) -> int:
+        return genome_id if isinstance(genome_id, int) else self.names.index(genome_id)
+
+    def shared(self) -> np.ndarray:
+        """
+        Returns the indices of the sites carried by every genome.
+        """
+        return np.flatnonzero(self.carrier_counts == len(self.db_files))
+
+    def private(self, genome_id) -> np.ndarray:
+        """
+        Returns the indices of the sites carried by one genome only, and
+        called in all the others.
+
+        Parameters:
+            genome_id (int or str): Row or name of the genome.
+        """
+        row = self._genome_row(genome_id)
+        return np.flatnonzero(
+            self.carriers[row]
+            & (self.carrier_counts == 1)
+            & (self.unknown_counts == 0)
+        )
+
+    def de_novo_candidates(self, proband) -> np.ndarray:
+        """
+        Returns the indices of the de novo candidate sites of a proband.
+
+        A candidate is private to the proband and passes the proband's
+        FILTER, and so is called absent in all other (e.g. parental) genomes.
+
+        Parameters:
+            proband (int or str): Row or name of the proband genome.
+        """
+        private = self.private(proband)
+        return private[self.passed[self._genome_row(proband), private]]
+
+    def summary(self) -> list:
+        """
+        Returns per-genome variant set sizes.
+
+        Returns:
+            list of dict: NAME, VARIANTS (carried sites), NO_CALLS, SHARED,
+                          PRIVATE, DE_NOVO_CANDIDATES.
+        """
+        n_shared = len(self.shared())
+        return [
+            {
+                "NAME": name,
+                "VARIANTS": int(self.carriers[i].sum()),
+                "NO_CALLS": self.no_call_counts[i],
+                "SHARED": n_shared,
+                "PRIVATE": len(self.private(i)),
+                "DE_NOVO_CANDIDATES": len(self.de_novo_candidates(i)),
+            }
+            for i, name in enumerate(self.names)
+        ]
+
+    def site_records(self, indices) -> list:
+        """
+        Returns the sites at the given indices.
+
+        Parameters:
+            indices (array-like): Site indices.
+
+        Returns:
+            list of dict: CHROM, POS, REF, ALT and carrier count of each site.
+        """
+        records = []
+        for index in indices:
+            chrom_id, pos, allele_id = self.sites[index]
+            ref, alt = self.allele_pairs[allele_id]
+            records.append(
+                {
+                    "CHROM": self.chrom_names[chrom_id],
+                    "POS": int(pos),
+                    "REF": ref,
+                    "ALT": alt,
+                    "CARRIERS": int(self.carrier_counts[index]),
+                }
+            )
+        return records
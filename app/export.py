@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+
+import csv
+import io
+import itertools
+import os
+import zlib
+
+
+# Number of variants per streamed chunk (and per Parquet row group)
+EXPORT_CHUNK_SIZE = 50000
+
+# Self DB columns added to exported VCF records as INFO tags
+VCF_INFO_TAGS = {
+    "REGION": ("GWAS_REGION", "String", "Cytogenetic region (GWAS Catalog)"),
+    "FUNCTION": ("GWAS_FUNCTION", "String", "Functional class (GWAS Catalog)"),
+    "MINPVALUE": ("GWAS_MINP", "Float", "Minimum association p-value (GWAS Catalog)"),
+    "ASSOCIATIONS": ("GWAS_ASSOC", "String", "Trait associations (GWAS Catalog)"),
+    "PATHOGENICITY": ("PATHOGENICITY", "String", "Predicted variant pathogenicity"),
+}
+
+# Characters that must be percent-encoded in VCF INFO values
+_VCF_INFO_ESCAPES = str.maketrans(
+    {
+        "%": "%25",
+        ":": "%3A",
+        ";": "%3B",
+        "=": "%3D",
+        ",": "%2C",
+        "\t": "%09",
+        "\n": "%0A",
+        "\r": "%0D",
+    }
+)
+
+
+def source_vcf_path(db_file: str) -> str:
+    """
+    Returns the path of the copy of the VCF file a Self DB was built from.
+
+    Parameters:
+        db_file (str): Path to the Self DB.
+    """
+    return f"{os.path.splitext(db_file)[0]}.vcf"
+
+
+def _iter_chunks(db, columns, order_by="rowid"):
+    rows = db.iter_data(
+        "variants", columns, f"ORDER BY {order_by}", chunk_size=EXPORT_CHUNK_SIZE
+    )
+    while True:
+        chunk = list(itertools.islice(rows, EXPORT_CHUNK_SIZE))
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_delimited_gz(db, delimiter="\t"):
+    """
+    Streams the variants table as a gzipped delimited text file.
+
+    Parameters:
+        db (selfdb.SelfDB): Self DB holding a variants table.
+        delimiter (str): Field delimiter, "\\t" for TSV or "," for CSV.
+
+    Yields:
+        bytes: Consecutive chunks of the gzip stream.
+    """
+    columns = list(db.table_columns("variants"))
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(columns)
+    for chunk in _iter_chunks(db, columns):
+        writer.writerows(chunk)
+        data = compressor.compress(buffer.getvalue().encode())
+        buffer.seek(0)
+        buffer.truncate()
+        if data:
+            yield data
+    yield compressor.compress(buffer.getvalue().encode()) + compressor.flush()
+
+
+class _ChunkSink:
+    """Write-only file object whose content is drained after each row group."""
+
+    closed = False
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_parquet(db):
+    """
+    Streams the variants table as a Parquet file, one row group per chunk.
+
+    Parameters:
+        db (selfdb.SelfDB): Self DB holding a variants table.
+
+    Yields:
+        bytes: Consecutive chunks of the Parquet file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    arrow_types = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+    columns = db.table_columns("variants")
+    schema = pa.schema(
+        [(col, arrow_types.get(dtype, pa.string())) for col, dtype in columns.items()]
+    )
+
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for chunk in _iter_chunks(db, list(columns)):
+            writer.write_table(
+                pa.Table.from_pylist(
+                    [dict(zip(columns, row)) for row in chunk], schema=schema
+                )
+            )
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _vcf_info(info, annotations):
+    tags = [
+        f"{VCF_INFO_TAGS[col][0]}={str(value).translate(_VCF_INFO_ESCAPES)}"
+        for col, value in annotations.items()
+        if value is not None and value != ""
+    ]
+    if not tags:
+        return info
+    return ";".join(tags) if info in (".", "") else ";".join([info, *tags])
+
+
+def iter_annotated_vcf(db, vcf_file):
+    """
+    Streams the uploaded VCF with the Self DB annotations as INFO tags.
+
+    The Self DB holds one variants row per VCF record, inserted in file
+    order, so both are read in lockstep without loading either in memory.
+    Each row must match its record's CHROM and POS.
+
+    Parameters:
+        db (selfdb.SelfDB): Self DB holding a variants table.
+        vcf_file (str): Path to the VCF file the Self DB was built from,
+                        see source_vcf_path().
+
+    Yields:
+        bytes: Consecutive chunks of the annotated VCF.
+
+    Raises:
+        ValueError: If the VCF records and the Self DB rows do not match.
+    """
+    columns = [col for col in VCF_INFO_TAGS if col in db.table_columns("variants")]
+    rows = itertools.chain.from_iterable(_iter_chunks(db, ["CHROM", "POS", *columns]))
+
+    with open(vcf_file, "r") as file:
+        lines = []
+        for line in file:
+            if line.startswith("##"):
+                lines.append(line)
+                continue
+
+            if line.startswith("#"):
+                # Declare the INFO tags before the column header line
+                lines += [
+                    f'##INFO=<ID={tag},Number=1,Type={type_},Description="{desc}">\n'
+                    for tag, type_, desc in [VCF_INFO_TAGS[col] for col in columns]
+                ]
+                lines.append(line)
+                continue
+
+            fields = line.rstrip("\n").split("\t")
+            row = next(rows, None)
+            if row is None or row[:2] != (fields[0], int(fields[1])):
+                raise ValueError(
+                    f"VCF record {fields[0]}:{fields[1]} does not match the "
+                    f"Self DB row {row[:2] if row else None}."
+                )
+            fields[7] = _vcf_info(fields[7], dict(zip(columns, row[2:])))
+            lines.append("\t".join(fields) + "\n")
+
+            if len(lines) >= EXPORT_CHUNK_SIZE:
+                yield "".join(lines).encode()
+                lines = []
+
+        if next(rows, None) is not None:
+            raise ValueError("The Self DB has more rows than the VCF has records.")
+        yield "".join(lines).encode()
+
+
+# Supported export formats: (generator of (db, vcf_file), MIME type, file name)
+EXPORT_FORMATS = {
+    "tsv": (
+        lambda db, vcf_file: iter_delimited_gz(db, delimiter="\t"),
+        "application/gzip",
+        "variants.tsv.gz",
+    ),
+    "csv": (
+        lambda db, vcf_file: iter_delimited_gz(db, delimiter=","),
+        "application/gzip",
+        "variants.csv.gz",
+    ),
+    "parquet": (
+        lambda db, vcf_file: iter_parquet(db),
+        "application/vnd.apache.parquet",
+        "variants.parquet",
+    ),
+    "vcf": (iter_annotated_vcf, "text/plain", "variants.annotated.vcf"),
+}
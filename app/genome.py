@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+# GRCh38 primary assembly chromosome lengths, in karyotype order
+GRCH38_CHROM_LENGTHS = {
+    "1": 248956422,
+    "2": 242193529,
+    "3": 198295559,
+    "4": 190214555,
+    "5": 181538259,
+    "6": 170805979,
+    "7": 159345973,
+    "8": 145138636,
+    "9": 138394717,
+    "10": 133797422,
+    "11": 135086622,
+    "12": 133275309,
+    "13": 114364328,
+    "14": 107043718,
+    "15": 101991189,
+    "16": 90338345,
+    "17": 83257441,
+    "18": 80373285,
+    "19": 58617616,
+    "20": 64444167,
+    "21": 46709983,
+    "22": 50818468,
+    "X": 156040895,
+    "Y": 57227415,
+    "MT": 16569,
+}
+
+# Integer code of each chromosome (its karyotype rank)
+CHROM_CODES = dict([(chrom, i) for i, chrom in enumerate(GRCH38_CHROM_LENGTHS)])
+
+# Start of each chromosome on a single genome-wide axis
+CHROM_OFFSETS = {}
+_offset = 0
+for _chrom, _length in GRCH38_CHROM_LENGTHS.items():
+    CHROM_OFFSETS[_chrom] = _offset
+    _offset += _length
+GENOME_LENGTH = _offset
+
+
+def normalize_chrom(chrom: str) -> str:
+    """
+    Normalizes a contig name to the keys of GRCH38_CHROM_LENGTHS.
+
+    Parameters:
+        chrom (str): Contig name, e.g. "chr1", "1", "chrM".
+
+    Returns:
+        str: Normalized name, e.g. "1", "MT".
+    """
+    if chrom.lower().startswith("chr"):
+        chrom = chrom[3:]
+    if chrom == "M":
+        chrom = "MT"
+    return chrom
+
+
+def genome_position(chrom: str, pos: int):
+    """
+    Maps a chromosome position onto the genome-wide axis.
+
+    Parameters:
+        chrom (str): Contig name.
+        pos (int): 1-based position on the contig.
+
+    Returns:
+        int or None: Genome-wide position, or None for unplaced contigs.
+    """
+    offset = CHROM_OFFSETS.get(normalize_chrom(chrom))
+    return None if offset is None else offset + pos
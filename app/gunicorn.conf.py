@@ -0,0 +1,23 @@
+# Production server configuration, loaded by gunicorn from the working directory
+# Usage: gunicorn app:server
+
+import multiprocessing
+import os
+
+
+bind = f"0.0.0.0:{os.environ.get('SELF_DNA_PORT', '8050')}"
+
+# Worker processes share no memory: per-session state lives in the state DB
+workers = int(os.environ.get("SELF_DNA_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+# Threaded workers keep progress polling responsive during a long ingest
+worker_class = "gthread"
+threads = int(os.environ.get("SELF_DNA_THREADS", 4))
+
+# VCF ingest runs inside the upload request and can take a long time
+timeout = int(os.environ.get("SELF_DNA_TIMEOUT", 0))
+
+# Each worker imports the app itself, so no SQLite handle crosses a fork
+preload_app = False
+
+accesslog = "-"
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+
+import collections
+import json
+import os
+import threading
+
+import plotly.utils
+
+
+# Memory budget of the layout cache, per worker process (gunicorn runs
+# 2 * cores + 1 workers by default)
+LAYOUT_CACHE_MB = int(os.environ.get("SELF_DNA_LAYOUT_CACHE_MB", 64))
+
+
+def encode_layout(layout) -> bytes:
+    """
+    Serializes a layout as the JSON Dash sends to the browser.
+
+    Parameters:
+        layout: Dash component tree.
+
+    Returns:
+        bytes: UTF-8 JSON encoding of the layout.
+    """
+    return json.dumps(layout, cls=plotly.utils.PlotlyJSONEncoder).encode()
+
+
+class LayoutCache:
+    """
+    Thread-safe LRU cache of rendered tab layouts, bounded in memory.
+
+    Layouts are stored as their JSON encoding, whose size is what counts
+    against the budget, rather than as component trees, which take several
+    times more memory than they serialize to.
+
+    Entries are keyed by (genome DB, tab, DB version): a finished ingest bumps
+    the version of its Self DB, so stale layouts are never served, even by
+    workers that did not run the ingest.
+    """
+
+    def __init__(self, max_bytes: int = LAYOUT_CACHE_MB * 1024 * 1024):
+        """
+        Parameters:
+            max_bytes (int): Maximum total size of the encoded layouts.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Returns a cached layout, or None on a miss.
+
+        Parameters:
+            key (tuple): (genome DB, tab, DB version).
+
+        Returns:
+            dict or None: Layout in its JSON form, which Dash renders like
+                          the component tree it was encoded from.
+        """
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(data)
+
+    def put(self, key, layout):
+        """
+        Caches a layout, evicting the least recently used ones to fit.
+
+        Parameters:
+            key (tuple): (genome DB, tab, DB version).
+            layout: Dash component tree.
+        """
+        data = encode_layout(layout)
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def invalidate(self, db_file: str = None):
+        """
+        Drops the cached layouts of a genome DB.
+
+        Parameters:
+            db_file (str, optional): Path to the Self DB. Defaults to all.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                if db_file is None or key[0] == db_file:
+                    self.size -= len(self._entries.pop(key))
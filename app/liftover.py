@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+
+import functools
+import gzip
+import heapq
+import os
+import re
+import tempfile
+
+import numpy as np
+
+import genome
+
+
+# Number of VCF records lifted per vectorized batch
+LIFTOVER_BATCH_SIZE = 100000
+
+# chr1 length of GRCh37, which tells it apart from GRCh38 (248956422)
+GRCH37_CHR1_LENGTH = 249250621
+
+# GRCh37 assembly names, matched as whole tokens of ##reference values and
+# ##contig assembly values
+GRCH37_PATTERN = re.compile(
+    r"(?<![A-Za-z0-9])(GRCh37|hg19|b37|hs37d5|hs37|human_g1k_v37)(?![A-Za-z0-9])",
+    re.IGNORECASE,
+)
+
+# Key=value fields of a structured VCF header line, e.g. <ID=1,length=...>
+_HEADER_FIELD_PATTERN = re.compile(r"([A-Za-z_]+)=([^,>]*)")
+
+# INFO tags recording the original coordinates of lifted records
+LIFTOVER_INFO_HEADER = [
+    '##INFO=<ID=OLD_CHROM,Number=1,Type=String,Description="GRCh37 chromosome">\n',
+    '##INFO=<ID=OLD_POS,Number=1,Type=Integer,Description="GRCh37 position">\n',
+    "##INFO=<ID=OLD_REVERSE,Number=0,Type=Flag,"
+    'Description="Lifted to the reverse strand">\n',
+]
+
+_COMPLEMENT = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+
+
+def is_grch37(vcf_file: str) -> bool:
+    """
+    Tells whether a VCF header declares a GRCh37 reference.
+
+    The length of the chr1 contig decides when the header declares it;
+    otherwise the ##reference and contig assembly values are matched
+    against GRCh37 assembly names.
+
+    Parameters:
+        vcf_file (str): Path to the VCF file.
+    """
+    declared = False
+    with open(vcf_file, "r") as file:
+        for line in file:
+            if not line.startswith("##"):
+                break
+            if line.startswith("##reference="):
+                value = line[len("##reference=") :]
+            elif line.startswith("##contig="):
+                fields = dict(_HEADER_FIELD_PATTERN.findall(line.partition("<")[2]))
+                chrom = genome.normalize_chrom(fields.get("ID", ""))
+                length = fields.get("length", "")
+                if chrom == "1" and length.isdigit():
+                    return int(length) == GRCH37_CHR1_LENGTH
+                value = fields.get("assembly", "")
+            else:
+                continue
+            declared = declared or GRCH37_PATTERN.search(value) is not None
+    return declared
+
+
+def reverse_complement(alleles: str) -> str:
+    """
+    Reverse-complements comma-separated VCF alleles, keeping symbolic ones.
+
+    Parameters:
+        alleles (str): REF or ALT field.
+    """
+    flipped = []
+    for allele in alleles.split(","):
+        if not (allele.startswith("<") or allele == "*"):
+            allele = allele.translate(_COMPLEMENT)[::-1]
+        flipped.append(allele)
+    return ",".join(flipped)
+
+
+class ChainMap:
+    """
+    UCSC chain file loaded into sorted interval arrays for batch liftover.
+
+    Every ungapped block of every chain becomes one interval; positions are
+    lifted by binary search (np.searchsorted) over the interval starts of
+    their chromosome.
+    """
+
+    def __init__(self, chain_file: str):
+        """
+        Reads a UCSC chain file, plain or gzipped.
+
+        Parameters:
+            chain_file (str): Path to the chain file, e.g. hg19ToHg38.over.chain.gz.
+        """
+        self.target_names = []
+        self.target_sizes = {}
+        target_codes = {}
+        blocks = {}
+
+        opener = gzip.open if chain_file.endswith(".gz") else open
+        with opener(chain_file, "rt") as file:
+            for line in file:
+                fields = line.split()
+                if not fields:
+                    continue
+
+                if fields[0] == "chain":
+                    t_name = genome.normalize_chrom(fields[2])
+                    t_pos = int(fields[5])
+                    q_name = genome.normalize_chrom(fields[7])
+                    q_size = int(fields[8])
+                    q_reverse = fields[9] == "-"
+                    q_pos = int(fields[10])
+                    if q_name not in target_codes:
+                        target_codes[q_name] = len(self.target_names)
+                        self.target_names.append(q_name)
+                        self.target_sizes[q_name] = q_size
+                    chrom_blocks = blocks.setdefault(t_name, [])
+                    continue
+
+                # Alignment data line: size [dt dq]
+                size = int(fields[0])
+                chrom_blocks.append(
+                    (
+                        t_pos,
+                        t_pos + size,
+                        target_codes[q_name],
+                        q_pos,
+                        q_size,
+                        q_reverse,
+                    )
+                )
+                if len(fields) == 3:
+                    t_pos += size + int(fields[1])
+                    q_pos += size + int(fields[2])
+
+        self.intervals = {}
+        for chrom, chrom_blocks in blocks.items():
+            chrom_blocks.sort()
+            starts, ends, codes, q_starts, q_sizes, reverse = zip(*chrom_blocks)
+            self.intervals[chrom] = {
+                "start": np.array(starts, dtype=np.int64),
+                "end": np.array(ends, dtype=np.int64),
+                "target": np.array(codes, dtype=np.int32),
+                "q_start": np.array(q_starts, dtype=np.int64),
+                "q_size": np.array(q_sizes, dtype=np.int64),
+                "reverse": np.array(reverse, dtype=bool),
+            }
+
+    def lift(self, chrom: str, positions):
+        """
+        Lifts 1-based positions on one chromosome.
+
+        Parameters:
+            chrom (str): Source chromosome.
+            positions (array-like): Source 1-based positions.
+
+        Returns:
+            tuple: (target chromosome codes into target_names, -1 if unmapped;
+                    target 1-based positions; reverse strand flags).
+        """
+        positions = np.asarray(positions, dtype=np.int64) - 1
+        targets = np.full(len(positions), -1, dtype=np.int32)
+        lifted = np.zeros(len(positions), dtype=np.int64)
+        reverse = np.zeros(len(positions), dtype=bool)
+
+        intervals = self.intervals.get(genome.normalize_chrom(chrom))
+        if intervals is None or len(positions) == 0:
+            return targets, lifted, reverse
+
+        index = np.searchsorted(intervals["start"], positions, side="right") - 1
+        mapped = index >= 0
+        mapped[mapped] &= positions[mapped] < intervals["end"][index[mapped]]
+
+        index = index[mapped]
+        q_pos = intervals["q_start"][index] + (
+            positions[mapped] - intervals["start"][index]
+        )
+        block_reverse = intervals["reverse"][index]
+        # Reverse-strand query coordinates count from the end of the chromosome
+        q_pos = np.where(block_reverse, intervals["q_size"][index] - q_pos - 1, q_pos)
+
+        targets[mapped] = intervals["target"][index]
+        lifted[mapped] = q_pos + 1
+        reverse[mapped] = block_reverse
+        return targets, lifted, reverse
+
+
+@functools.lru_cache(maxsize=4)
+def load_chain_map(chain_file: str) -> ChainMap:
+    """
+    Returns the ChainMap of a chain file, parsed once per process.
+
+    Parameters:
+        chain_file (str): Path to the chain file.
+    """
+    return ChainMap(chain_file)
+
+
+def _chrom_name(chrom: str, like: str) -> str:
+    # Name a normalized chromosome in the style of the input VCF
+    if not like.lower().startswith("chr"):
+        return chrom
+    return "chrM" if chrom == "MT" else f"chr{chrom}"
+
+
+def _lift_batch(chain_map, records):
+    """Lift a batch of split VCF records, returning (lifted, unmapped) lines."""
+    chroms = np.array([fields[0] for fields in records])
+    positions = np.array([int(fields[1]) for fields in records], dtype=np.int64)
+    ref_lengths = np.array([len(fields[3]) for fields in records], dtype=np.int64)
+    indel = np.array(
+        [len(fields[3]) != len(fields[4].split(",")[0]) for fields in records]
+    )
+
+    targets = np.full(len(records), -1, dtype=np.int32)
+    lifted = np.zeros(len(records), dtype=np.int64)
+    reverse = np.zeros(len(records), dtype=bool)
+    for chrom in np.unique(chroms):
+        rows = np.flatnonzero(chroms == chrom)
+        targets[rows], lifted[rows], reverse[rows] = chain_map.lift(
+            chrom, positions[rows]
+        )
+
+        # On the reverse strand the last REF base becomes the first one
+        flipped = rows[reverse[rows] & (ref_lengths[rows] > 1)]
+        end_targets, end_lifted, _ = chain_map.lift(
+            chrom, positions[flipped] + ref_lengths[flipped] - 1
+        )
+        lifted[flipped] = end_lifted
+        targets[flipped] = np.where(
+            end_targets == targets[flipped], end_targets, -1
+        )
+
+    # Reverse-strand indels would need the new reference to be re-normalized
+    unmapped = (targets < 0) | (reverse & indel)
+
+    lifted_lines, unmapped_lines = [], []
+    for i, fields in enumerate(records):
+        if unmapped[i]:
+            unmapped_lines.append("\t".join(fields) + "\n")
+            continue
+        tags = [f"OLD_CHROM={fields[0]}", f"OLD_POS={fields[1]}"]
+        if reverse[i]:
+            tags.append("OLD_REVERSE")
+            fields[3] = reverse_complement(fields[3])
+            fields[4] = reverse_complement(fields[4])
+        fields[0] = _chrom_name(chain_map.target_names[targets[i]], fields[0])
+        fields[1] = str(lifted[i])
+        fields[7] = ";".join(tags if fields[7] in (".", "") else [fields[7], *tags])
+        lifted_lines.append("\t".join(fields) + "\n")
+    return lifted_lines, unmapped_lines
+
+
+def _sort_key(line: str):
+    # Sort lifted records by (karyotype order, POS), other contigs last by name
+    chrom, pos = line.split("\t", 2)[:2]
+    chrom = genome.normalize_chrom(chrom)
+    return (genome.CHROM_CODES.get(chrom, len(genome.CHROM_CODES)), chrom, int(pos))
+
+
+def lift_vcf(vcf_file: str, lifted_file: str, chain_map: ChainMap):
+    """
+    Lifts a GRCh37 VCF to GRCh38, in vectorized batches of records.
+
+    Lifted records keep their original coordinates in the OLD_CHROM and
+    OLD_POS INFO tags, and are sorted by (contig, POS): reverse-strand and
+    cross-chromosome lifts reorder records, so each batch is sorted into a
+    temporary run file and the runs are merged, in bounded memory. The
+    ##contig lines declare every GRCh38 contig present in the output.
+    Records that cannot be lifted are written unchanged, in input order, to
+    a .unmapped.vcf file next to the lifted VCF.
+
+    Parameters:
+        vcf_file (str): Path to the input GRCh37 VCF file.
+        lifted_file (str): Path to the output GRCh38 VCF file.
+        chain_map (ChainMap): GRCh37 to GRCh38 chain map.
+
+    Returns:
+        tuple: Number of lifted and of unmapped records.
+    """
+    unmapped_file = f"{os.path.splitext(lifted_file)[0]}.unmapped.vcf"
+    n_lifted, n_unmapped = 0, 0
+    meta_lines = []
+    column_header = ""
+    contigs = set()
+    runs = []
+
+    def write_run(lifted_lines):
+        lifted_lines.sort(key=_sort_key)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=os.path.dirname(lifted_file) or ".", suffix=".run", delete=False
+        ) as run:
+            run.writelines(lifted_lines)
+        runs.append(run.name)
+        contigs.update([line.split("\t", 1)[0] for line in lifted_lines])
+
+    try:
+        with open(vcf_file, "r") as file, open(unmapped_file, "w") as unmapped_out:
+            records = []
+            for line in file:
+                if line.startswith("#"):
+                    unmapped_out.write(line)
+                    if line.startswith("##reference"):
+                        meta_lines.append("##reference=GRCh38\n")
+                    elif line.startswith("##"):
+                        # GRCh37 contig lines are replaced by the GRCh38 ones
+                        if not line.startswith("##contig"):
+                            meta_lines.append(line)
+                    else:
+                        column_header = line
+                    continue
+
+                records.append(line.rstrip("\n").split("\t"))
+                if len(records) >= LIFTOVER_BATCH_SIZE:
+                    lifted_lines, unmapped_lines = _lift_batch(chain_map, records)
+                    write_run(lifted_lines)
+                    unmapped_out.writelines(unmapped_lines)
+                    n_lifted += len(lifted_lines)
+                    n_unmapped += len(unmapped_lines)
+                    records = []
+
+            if records:
+                lifted_lines, unmapped_lines = _lift_batch(chain_map, records)
+                write_run(lifted_lines)
+                unmapped_out.writelines(unmapped_lines)
+                n_lifted += len(lifted_lines)
+                n_unmapped += len(unmapped_lines)
+
+        with open(lifted_file, "w") as lifted_out:
+            lifted_out.writelines(meta_lines)
+            for chrom in sorted(contigs, key=lambda chrom: _sort_key(f"{chrom}\t0")):
+                length = chain_map.target_sizes[genome.normalize_chrom(chrom)]
+                lifted_out.write(
+                    f"##contig=<ID={chrom},length={length},assembly=GRCh38>\n"
+                )
+            lifted_out.writelines(LIFTOVER_INFO_HEADER)
+            lifted_out.write(column_header)
+
+            run_files = [open(run, "r") for run in runs]
+            try:
+                lifted_out.writelines(heapq.merge(*run_files, key=_sort_key))
+            finally:
+                for run_file in run_files:
+                    run_file.close()
+    finally:
+        for run in runs:
+            os.remove(run)
+
+    return n_lifted, n_unmapped
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+import math
+import sqlite3
+
+import genome
+
+
+# Bin width in bp of each pyramid level, from the finest (level 0) up
+BIN_SIZES = [1000 * 4**level for level in range(8)]
+
+# Maximum number of points returned for any view of the genome
+MAX_POINTS = 2000
+
+# p-values are floored so that p = 0 still maps to a finite -log10 p
+MIN_PVALUE = 1e-300
+
+PYRAMID_COLUMNS = {
+    "LEVEL": "INTEGER",
+    "BIN": "INTEGER",
+    "GPOS": "INTEGER",
+    "CHROM": "TEXT",
+    "POS": "INTEGER",
+    "ID": "TEXT",
+    "MLOG10P": "REAL",
+}
+
+
+def build_pyramid(db):
+    """
+    Precomputes the Manhattan plot binning pyramid of a Self DB.
+
+    Each level holds, for every genomic bin containing at least one variant
+    with a GWAS Catalog p-value, the variant with the highest -log10 p.
+    Level 0 is built from the variants table, each coarser level from the
+    level below it.
+
+    Parameters:
+        db (selfdb.SelfDB): Writable Self DB holding a variants table.
+    """
+    level_bins = {}
+    for chrom, pos, id_, min_pvalue in db.iter_data(
+        "variants",
+        ["CHROM", "POS", "ID", "MINPVALUE"],
+        "WHERE MINPVALUE IS NOT NULL",
+    ):
+        gpos = genome.genome_position(chrom, pos)
+        if gpos is None:
+            continue
+        mlog10p = -math.log10(max(min_pvalue, MIN_PVALUE))
+        bin_ = gpos // BIN_SIZES[0]
+        top = level_bins.get(bin_)
+        if top is None or mlog10p > top[-1]:
+            level_bins[bin_] = (gpos, chrom, pos, id_, mlog10p)
+
+    db.drop_table("manhattan_pyramid")
+    db.create_table("manhattan_pyramid", PYRAMID_COLUMNS)
+
+    columns = list(PYRAMID_COLUMNS.keys())
+    for level in range(len(BIN_SIZES)):
+        if level > 0:
+            factor = BIN_SIZES[level] // BIN_SIZES[level - 1]
+            coarser_bins = {}
+            for bin_, top in level_bins.items():
+                coarse = coarser_bins.get(bin_ // factor)
+                if coarse is None or top[-1] > coarse[-1]:
+                    coarser_bins[bin_ // factor] = top
+            level_bins = coarser_bins
+        db.insert_many(
+            "manhattan_pyramid",
+            columns,
+            [(level, bin_, *top) for bin_, top in level_bins.items()],
+        )
+
+    db.create_index(
+        "manhattan_pyramid_level_gpos", "manhattan_pyramid", ["LEVEL", "GPOS"]
+    )
+
+
+def pyramid_level(start: int, end: int) -> int:
+    """
+    Chooses the finest pyramid level returning at most MAX_POINTS bins.
+
+    Parameters:
+        start (int): Genome-wide start of the view.
+        end (int): Genome-wide end of the view.
+
+    Returns:
+        int: Pyramid level.
+    """
+    for level, bin_size in enumerate(BIN_SIZES):
+        if (end - start) / bin_size <= MAX_POINTS:
+            return level
+    return len(BIN_SIZES) - 1
+
+
+def fetch_bins(db, start: int = 0, end: int = genome.GENOME_LENGTH):
+    """
+    Fetches the pyramid bins in view at the resolution fitting the view.
+
+    Parameters:
+        db (selfdb.SelfDB): Self DB holding a manhattan_pyramid table.
+        start (int): Genome-wide start of the view.
+        end (int): Genome-wide end of the view.
+
+    Returns:
+        list of tuple: (GPOS, CHROM, POS, ID, MLOG10P) rows, empty while the
+                       pyramid has not been built yet.
+    """
+    start, end = max(int(start), 0), min(int(end), genome.GENOME_LENGTH)
+    try:
+        return db.read_data(
+            "manhattan_pyramid",
+            ["GPOS", "CHROM", "POS", "ID", "MLOG10P"],
+            "WHERE LEVEL = ? AND GPOS BETWEEN ? AND ? ORDER BY GPOS LIMIT ?",
+            (pyramid_level(start, end), start, end, MAX_POINTS),
+        )
+    except sqlite3.OperationalError:
+        return []
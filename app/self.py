@@ -4,13 +4,35 @@
 import uuid
 import requests
 import pysam
-import sqlite3
 import os
+import shutil
+
+import columnar
+import export
+import manhattan
+import selfdb
 
 
 GWAS_CATALOG_BASE_URL = "https://www.ebi.ac.uk/gwas/rest/api/"
 GWAS_CATALOG_SNP = "singleNucleotidePolymorphisms/"
 
+# Schema of the variants table in each Self DB
+VARIANTS_COLUMNS = {
+    "CHROM": "TEXT",
+    "POS": "INTEGER",
+    "ID": "TEXT",
+    "REF": "TEXT",
+    "ALT": "TEXT",
+    "QUAL": "REAL",
+    "FILTER": "TEXT",
+    "GT": "TEXT",
+    "REGION": "TEXT",
+    "FUNCTION": "TEXT",
+    "MINPVALUE": "REAL",
+    "ASSOCIATIONS": "TEXT",
+    "PATHOGENICITY": "TEXT",
+}
+
 
 class Self(pysam.libcbcf.VariantFile):
     """
@@ -69,32 +91,22 @@ class Self(pysam.libcbcf.VariantFile):
         if not os.path.exists(db_dir):
             os.makedirs(db_dir)
 
-        # Connect to SQLite database
-        conn = sqlite3.connect(db_file)
-        cursor = conn.cursor()
+        # Open the Self DB through the batched-write data-access layer
+        db = selfdb.SelfDB(db_file)
 
         # Create a table for the VCF data
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS variants (
-                CHROM TEXT,
-                POS INTEGER,
-                ID TEXT,
-                REF TEXT,
-                ALT TEXT,
-                QUAL REAL,
-                FILTER TEXT,
-                REGION TEXT,
-                FUNCTION TEXT,
-                MINPVALUE REAL,
-                ASSOCIATIONS TEXT,
-                PATHOGENICITY TEXT
-            )
-        """
-        )
+        db.create_table("variants", VARIANTS_COLUMNS)
+
+        # Columnar sidecar for vectorized scans, written next to the Self DB
+        sidecar = columnar.ColumnarWriter(columnar.sidecar_path(db_file))
+
+        # Keep a copy of the VCF next to the Self DB, so that exports never
+        # read an upload that has since changed
+        source_vcf = export.source_vcf_path(db_file)
+        shutil.copyfile(vcf_file, source_vcf)
 
         # Parse VCF file and insert data
-        with open(vcf_file, "r") as file:
+        with open(source_vcf, "r") as file:
 
             total_lines = sum(1 for _ in file if not _.startswith("#"))
             file.seek(0)
@@ -116,37 +128,58 @@ class Self(pysam.libcbcf.VariantFile):
                     self.add_gwas_catalog_variant_data(id_, alt)
                 )
 
-                # Insert row into SQLite table
-                cursor.execute(
-                    """
-                    INSERT INTO variants (CHROM, POS, ID, REF, ALT, QUAL, FILTER, REGION, FUNCTION, MINPVALUE, ASSOCIATIONS)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    # INSERT INTO variants (CHROM, POS, ID, REF, ALT, QUAL, FILTER)
-                    # VALUES (?, ?, ?, ?, ?, ?, ?)
-                    # """,
-                    (
-                        chrom,
-                        int(pos),
-                        id_,
-                        ref,
-                        alt,
-                        float(qual) if qual != "." else None,
-                        filter_,
-                        region,
-                        functionalClass,
-                        min_pvalue,
-                        associations,
-                    ),
+                qual = float(qual) if qual != "." else None
+                gt = (
+                    columnar.genotype_field(columns[8], columns[9])
+                    if len(columns) > 9
+                    else None
+                )
+
+                # Buffer row, written to the SQLite table in batches
+                db.insert_data(
+                    "variants",
+                    {
+                        "CHROM": chrom,
+                        "POS": int(pos),
+                        "ID": id_,
+                        "REF": ref,
+                        "ALT": alt,
+                        "QUAL": qual,
+                        "FILTER": filter_,
+                        "GT": gt,
+                        "REGION": region,
+                        "FUNCTION": functionalClass,
+                        "MINPVALUE": min_pvalue,
+                        "ASSOCIATIONS": associations,
+                    },
+                )
+
+                sidecar.append(
+                    chrom,
+                    int(pos),
+                    ref,
+                    alt,
+                    qual,
+                    columnar.genotype_code(gt),
+                    min_pvalue,
                 )
 
                 processed_lines += 1
                 if progress_callback:
                     progress_callback(processed_lines, total_lines)
 
-        # Commit the transaction and close the connection
-        conn.commit()
-        conn.close()
+        # Write the remaining rows and the columnar sidecar
+        db.flush()
+        sidecar.close()
+
+        # Precompute the Manhattan plot binning pyramid
+        manhattan.build_pyramid(db)
+
+        # Mark the Self DB as complete, invalidating cached views of it
+        db.bump_version()
+
+        # Close the connection
+        db.close()
 
     def fetch_vcf_records(self, sample_id=None, region=None):
         """
@@ -1,71 +1,339 @@
 #!/usr/bin/env python3
 
+import collections
+import functools
+import logging
+import os
 import sqlite3
+import threading
+import time
+import urllib.parse
+
+
+logger = logging.getLogger(__name__)
+
+# Number of compiled statements sqlite3 keeps per connection
+CACHED_STATEMENTS = 256
+
+# Number of buffered rows written per transaction
+WRITE_BATCH_SIZE = 1000
+
+# Number of rows fetched per round trip when streaming reads
+READ_CHUNK_SIZE = 1000
+
+# Maximum number of pooled connections per thread
+POOL_SIZE = 8
+
+# Number of seconds after which an unused pooled connection is closed
+POOL_IDLE_TIMEOUT = 300
+
+
+# Connections are pooled per thread, keyed by (database path, read-only flag),
+# so that Dash's threaded callbacks never share a sqlite3 connection. Each pool
+# maps keys to (connection, last use) in least recently used order.
+_local = threading.local()
+
+
+def _connection_uri(db_name: str, read_only: bool) -> str:
+    """Build the SQLite URI used to open a database.
+
+    Parameters:
+        db_name (str): Path to the database file.
+        read_only (bool): Open the database with mode=ro.
+
+    Returns:
+        str: A file: URI for sqlite3.connect(uri=True).
+    """
+    uri = f"file:{urllib.parse.quote(os.path.abspath(db_name))}"
+    return f"{uri}?mode=ro" if read_only else uri
+
+
+def _pool() -> collections.OrderedDict:
+    pool = getattr(_local, "pool", None)
+    if pool is None:
+        pool = _local.pool = collections.OrderedDict()
+    return pool
+
+
+def get_connection(db_name: str, read_only: bool = False) -> sqlite3.Connection:
+    """Return the calling thread's pooled connection to a database.
+
+    Connections idle for more than POOL_IDLE_TIMEOUT seconds, and the least
+    recently used ones beyond POOL_SIZE, are closed.
+
+    Parameters:
+        db_name (str): Path to the database file.
+        read_only (bool): Open the database with a read-only URI.
+
+    Returns:
+        sqlite3.Connection: A connection owned by the calling thread.
+    """
+    key = (os.path.abspath(db_name), read_only)
+    pool = _pool()
+    now = time.monotonic()
+
+    entry = pool.pop(key, None)
+    connection = entry[0] if entry is not None else None
+    if connection is None:
+        connection = sqlite3.connect(
+            _connection_uri(db_name, read_only),
+            uri=True,
+            cached_statements=CACHED_STATEMENTS,
+        )
+        if not read_only:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+        logger.debug(f"Connected to database '{db_name}' (read_only={read_only})")
+
+    # Evict idle and least recently used connections, then mark this one used
+    for other_key, (other, last_use) in list(pool.items()):
+        if now - last_use > POOL_IDLE_TIMEOUT or len(pool) >= POOL_SIZE:
+            del pool[other_key]
+            other.close()
+    pool[key] = (connection, now)
+    return connection
+
+
+def close_connections(db_name: str = None):
+    """Close the calling thread's pooled connections.
+
+    Connections of other threads are left open, since they may be in use;
+    they are closed by their own thread once idle or evicted.
+
+    Parameters:
+        db_name (str, optional): Only close connections to this database.
+                                 Defaults to all databases.
+    """
+    path = os.path.abspath(db_name) if db_name is not None else None
+    pool = _pool()
+    for key in [key for key in pool if path is None or key[0] == path]:
+        pool.pop(key)[0].close()
+
+
+@functools.lru_cache(maxsize=None)
+def _insert_sql(table_name: str, columns: tuple) -> str:
+    placeholders = ", ".join(["?" for _ in columns])
+    return f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+
+
+@functools.lru_cache(maxsize=None)
+def _select_sql(table_name: str, columns: str, where_clause: str) -> str:
+    return f"SELECT {columns} FROM {table_name} {where_clause}".strip()
 
 
 class SelfDB:
-    def __init__(self, db_name: str):
-        """Initialize and connect to the SQLite database."""
-        self.connection = sqlite3.connect(db_name)
-        self.cursor = self.connection.cursor()
-        print(f"Connected to database '{db_name}'")
+    """
+    Data-access layer for Self DBs.
+
+    Every thread gets its own pooled connection, read-only handles are opened
+    through mode=ro URIs, SQL text is memoised so that sqlite3's per-connection
+    statement cache is hit, writes are buffered and committed in batches, and
+    reads can be streamed with fetchmany.
+    """
+
+    def __init__(
+        self,
+        db_name: str,
+        read_only: bool = False,
+        batch_size: int = WRITE_BATCH_SIZE,
+    ):
+        """Initialize the data-access layer for a SQLite database.
 
-    def create_table(self, table_name: str, columns: dict):
+        Parameters:
+            db_name (str): Path to the database file.
+            read_only (bool): Open the database with a read-only URI.
+            batch_size (int): Number of buffered rows per write transaction.
+        """
+        self.db_name = db_name
+        self.read_only = read_only
+        self.batch_size = batch_size
+        self._buffers = {}
+        self._buffer_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+        self.close()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's pooled connection."""
+        return get_connection(self.db_name, self.read_only)
+
+    def execute(self, sql_query: str, params=()) -> sqlite3.Cursor:
+        """Execute a statement on the calling thread's connection.
+
+        Parameters:
+            sql_query (str): SQL statement.
+            params (tuple or dict): Statement parameters.
+
+        Returns:
+            sqlite3.Cursor: Cursor over the results.
+        """
+        return self.connection.execute(sql_query, params)
+
+    def create_table(self, table_name: str, columns: dict, constraints=()):
         """Create a table in the database.
 
         Parameters:
             table_name (str): Name of the table.
             columns (dict): Dictionary with column names as keys and data types as values.
+            constraints (list or tuple): Optional table constraints,
+                                         e.g. "PRIMARY KEY (a, b)".
         """
-        columns_def = ", ".join([f"{col} {dtype}" for col, dtype in columns.items()])
+        columns_def = ", ".join(
+            [f"{col} {dtype}" for col, dtype in columns.items()] + list(constraints)
+        )
         sql_query = f"CREATE TABLE IF NOT EXISTS {table_name} ({columns_def})"
-        self.cursor.execute(sql_query)
-        print(f"Table '{table_name}' created or already exists.")
+        with self.connection:
+            self.connection.execute(sql_query)
+
+    def table_columns(self, table_name: str) -> dict:
+        """Return the columns of a table.
+
+        Parameters:
+            table_name (str): Name of the table.
+
+        Returns:
+            dict: Column names as keys and declared data types as values.
+        """
+        rows = self.execute(f"PRAGMA table_info({table_name})").fetchall()
+        return dict([(row[1], row[2]) for row in rows])
+
+    def get_version(self) -> int:
+        """Return the data version of the database (SQLite user_version)."""
+        return self.execute("PRAGMA user_version").fetchone()[0]
+
+    def bump_version(self) -> int:
+        """Increment the data version of the database.
+
+        Returns:
+            int: The new data version.
+        """
+        version = self.get_version() + 1
+        with self.connection:
+            self.connection.execute(f"PRAGMA user_version = {version}")
+        return version
+
+    def create_index(self, index_name: str, table_name: str, columns):
+        """Create an index on a table in the database.
+
+        Parameters:
+            index_name (str): Name of the index.
+            table_name (str): Name of the table.
+            columns (list or tuple): Indexed columns.
+        """
+        sql_query = (
+            f"CREATE INDEX IF NOT EXISTS {index_name} "
+            f"ON {table_name} ({', '.join(columns)})"
+        )
+        with self.connection:
+            self.connection.execute(sql_query)
+
+    def drop_table(self, table_name: str):
+        """Drop a table from the database, if it exists.
+
+        Parameters:
+            table_name (str): Name of the table.
+        """
+        with self.connection:
+            self.connection.execute(f"DROP TABLE IF EXISTS {table_name}")
 
     def insert_data(self, table_name: str, data: dict):
-        """Insert a row of data into a specified table.
+        """Buffer a row of data for a specified table.
+
+        The buffer is written once it holds batch_size rows, or on flush().
 
         Parameters:
             table_name (str): Name of the table.
             data (dict): Dictionary with column names as keys and row data as values.
         """
-        columns = ", ".join(data.keys())
-        placeholders = ", ".join(["?" for _ in data])
-        sql_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-        self.cursor.execute(sql_query, tuple(data.values()))
-        self.connection.commit()
-        print(f"Inserted data into '{table_name}': {data}")
-
-    def read_data(self, table_name: str, columns="*", where_clause=""):
+        key = (table_name, tuple(data.keys()))
+        with self._buffer_lock:
+            buffer = self._buffers.setdefault(key, [])
+            buffer.append(tuple(data.values()))
+            if len(buffer) < self.batch_size:
+                return
+            rows = self._buffers.pop(key)
+        self.insert_many(table_name, key[1], rows)
+
+    def insert_many(self, table_name: str, columns, rows):
+        """Insert rows into a specified table in a single transaction.
+
+        Parameters:
+            table_name (str): Name of the table.
+            columns (list or tuple): Column names.
+            rows (iterable of tuple): Row values, ordered as columns.
+        """
+        sql_query = _insert_sql(table_name, tuple(columns))
+        with self.connection:
+            self.connection.executemany(sql_query, rows)
+
+    def flush(self):
+        """Write all buffered rows."""
+        with self._buffer_lock:
+            buffers, self._buffers = self._buffers, {}
+        for (table_name, columns), rows in buffers.items():
+            self.insert_many(table_name, columns, rows)
+
+    def iter_data(
+        self,
+        table_name: str,
+        columns="*",
+        where_clause="",
+        params=(),
+        chunk_size: int = READ_CHUNK_SIZE,
+    ):
+        """Stream data from a specified table with an optional where clause.
+
+        Parameters:
+            table_name (str): Name of the table.
+            columns (str or list): Columns to retrieve. Default is '*'.
+            where_clause (str): Optional SQL where clause, may use placeholders.
+            params (tuple or dict): Parameters for the where clause.
+            chunk_size (int): Number of rows fetched per round trip.
+
+        Yields:
+            tuple: Retrieved data rows.
+        """
+        columns = ", ".join(columns) if isinstance(columns, (list, tuple)) else columns
+        cursor = self.execute(_select_sql(table_name, columns, where_clause), params)
+        try:
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            cursor.close()
+
+    def read_data(self, table_name: str, columns="*", where_clause="", params=()):
         """Read data from a specified table with an optional where clause.
 
         Parameters:
             table_name (str): Name of the table.
             columns (str or list): Columns to retrieve. Default is '*'.
-            where_clause (str): Optional SQL where clause.
+            where_clause (str): Optional SQL where clause, may use placeholders.
+            params (tuple or dict): Parameters for the where clause.
 
         Returns:
             list of tuple: Retrieved data rows.
         """
-        columns = ", ".join(columns) if isinstance(columns, (list, tuple)) else columns
-        sql_query = f"SELECT {columns} FROM {table_name} {where_clause}"
-        self.cursor.execute(sql_query)
-        rows = self.cursor.fetchall()
-        print(f"Retrieved data from '{table_name}': {rows}")
-        return rows
+        return list(self.iter_data(table_name, columns, where_clause, params))
 
     def close(self):
-        """Close the database connection."""
-        self.connection.close()
-        print("Database connection closed.")
+        """Close the calling thread's pooled connections to this database."""
+        close_connections(self.db_name)
 
 
 # Example Usage
 if __name__ == "__main__":
-    db = SelfDB("example.db")
-    db.create_table(
-        "users", {"id": "INTEGER PRIMARY KEY", "name": "TEXT", "age": "INTEGER"}
-    )
-    db.insert_data("users", {"name": "Alice", "age": 30})
-    data = db.read_data("users")
-    db.close()
+    with SelfDB("example.db") as db:
+        db.create_table(
+            "users", {"id": "INTEGER PRIMARY KEY", "name": "TEXT", "age": "INTEGER"}
+        )
+        db.insert_data("users", {"name": "Alice", "age": 30})
+    data = SelfDB("example.db", read_only=True).read_data("users")
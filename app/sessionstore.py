@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import os
+
+import selfdb
+
+
+# Shared state DB, reachable by every server worker
+# (the directory Self DBs are written to by default, see self.Self)
+STATE_DB = os.path.join("databases", "state.db")
+
+SESSIONS_COLUMNS = {
+    "SESSION_ID": "TEXT PRIMARY KEY",
+    "VCF_PATH": "TEXT",
+    "DB_FILE": "TEXT",
+    "PROCESSED": "INTEGER NOT NULL DEFAULT 0",
+    "TOTAL": "INTEGER NOT NULL DEFAULT 1",
+}
+
+GENOMES_COLUMNS = {
+    "SESSION_ID": "TEXT",
+    "NAME": "TEXT",
+    "DB_FILE": "TEXT",
+}
+GENOMES_CONSTRAINTS = ("PRIMARY KEY (SESSION_ID, DB_FILE)",)
+
+
+class SessionStore:
+    """
+    Per-session app state kept in SQLite rather than in module globals.
+
+    Any worker process can serve any request: the uploaded genomes, the
+    active genome and the ingest progress of a browser session are looked up
+    by session ID.
+    """
+
+    def __init__(self, db_file: str = STATE_DB):
+        """Initialize the store, creating its database if needed.
+
+        Parameters:
+            db_file (str): Path to the shared state database.
+        """
+        db_dir = os.path.dirname(db_file)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir, exist_ok=True)
+
+        self.db = selfdb.SelfDB(db_file)
+        self.db.create_table("sessions", SESSIONS_COLUMNS)
+        self.db.create_table("genomes", GENOMES_COLUMNS, GENOMES_CONSTRAINTS)
+
+    def _upsert(self, session_id: str, data: dict):
+        columns = ", ".join(["SESSION_ID", *data.keys()])
+        placeholders = ", ".join(["?" for _ in range(len(data) + 1)])
+        updates = ", ".join([f"{col} = excluded.{col}" for col in data])
+        sql_query = (
+            f"INSERT INTO sessions ({columns}) VALUES ({placeholders}) "
+            f"ON CONFLICT(SESSION_ID) DO UPDATE SET {updates}"
+        )
+        with self.db.connection:
+            self.db.execute(sql_query, (session_id, *data.values()))
+
+    def set_active_genome(self, session_id: str, vcf_path: str, db_file: str):
+        """Select the genome shown to a session and reset its progress.
+
+        Parameters:
+            session_id (str): Browser session ID.
+            vcf_path (str): Path to the uploaded VCF file.
+            db_file (str): Path to the genome's Self DB.
+        """
+        self._upsert(
+            session_id,
+            {"VCF_PATH": vcf_path, "DB_FILE": db_file, "PROCESSED": 0, "TOTAL": 1},
+        )
+
+    def get_active_genome(self, session_id: str):
+        """Return the Self DB selected by a session.
+
+        Parameters:
+            session_id (str): Browser session ID.
+
+        Returns:
+            str or None: Path to the Self DB, or None if no genome is selected.
+        """
+        rows = self.db.read_data(
+            "sessions", ["DB_FILE"], "WHERE SESSION_ID = ?", (session_id,)
+        )
+        return rows[0][0] if rows else None
+
+    def add_genome(self, session_id: str, name: str, db_file: str):
+        """Add a genome to the genomes uploaded by a session.
+
+        Parameters:
+            session_id (str): Browser session ID.
+            name (str): Display name of the genome.
+            db_file (str): Path to the genome's Self DB.
+        """
+        with self.db.connection:
+            self.db.execute(
+                "INSERT OR REPLACE INTO genomes (SESSION_ID, NAME, DB_FILE) "
+                "VALUES (?, ?, ?)",
+                (session_id, name, db_file),
+            )
+
+    def list_genomes(self, session_id: str):
+        """Return the genomes uploaded by a session.
+
+        Parameters:
+            session_id (str): Browser session ID.
+
+        Returns:
+            list of tuple: (NAME, DB_FILE) of each genome, in upload order.
+        """
+        return self.db.read_data(
+            "genomes",
+            ["NAME", "DB_FILE"],
+            "WHERE SESSION_ID = ? ORDER BY rowid",
+            (session_id,),
+        )
+
+    def set_progress(self, session_id: str, processed: int, total: int):
+        """Record the ingest progress of a session.
+
+        Parameters:
+            session_id (str): Browser session ID.
+            processed (int): Number of processed variants.
+            total (int): Total number of variants.
+        """
+        self._upsert(session_id, {"PROCESSED": processed, "TOTAL": total})
+
+    def get_progress(self, session_id: str):
+        """Return the ingest progress of a session.
+
+        Parameters:
+            session_id (str): Browser session ID.
+
+        Returns:
+            tuple: (processed, total), (0, 1) when nothing is being processed.
+        """
+        rows = self.db.read_data(
+            "sessions", ["PROCESSED", "TOTAL"], "WHERE SESSION_ID = ?", (session_id,)
+        )
+        return rows[0] if rows else (0, 1)